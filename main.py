@@ -1,19 +1,74 @@
 import os
 import time
 import csv
+import queue
+import threading
+from collections import OrderedDict
 import tkinter as tk
+from dataclasses import dataclass, astuple, fields
+from urllib.parse import urlencode
 from tkinter import ttk, messagebox
 import aiohttp
 import asyncio
 from dotenv import load_dotenv
 import folium
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderServiceError
-from aiocache import cached
+from aiolimiter import AsyncLimiter
+from diskcache import Cache
+import orjson
 
 # Load environment variables
 load_dotenv()
 
+# Google Places endpoints and the fields requested for each place
+NEARBY_BASE = 'https://maps.googleapis.com/maps/api/place/nearbysearch/json'
+DETAILS_BASE = 'https://maps.googleapis.com/maps/api/place/details/json'
+DETAIL_FIELDS = 'name,formatted_phone_number,website,formatted_address,types,business_status,reviews'
+
+# Limits on Google Places requests: in-flight requests and requests per second
+PLACES_MAX_CONCURRENCY = 8
+PLACES_RATE_LIMIT = 10
+
+# On-disk cache of Place Details, reused across runs for a week
+PLACES_CACHE_DIR = os.path.expanduser('~/.cache/nichehunter/places')
+PLACES_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Nominatim search endpoint; its usage policy requires a User-Agent and at most 1 request/s
+NOMINATIM_URL = 'https://nominatim.openstreetmap.org/search'
+NOMINATIM_USER_AGENT = 'business_niche_finder'
+
+# How long geocoding results are reused before asking Nominatim again, and
+# how many distinct place names are remembered
+GEOCODE_CACHE_TTL = 24 * 60 * 60
+GEOCODE_CACHE_SIZE = 1024
+
+# Reviews newer than this many seconds count as "recent"
+RECENT_REVIEW_WINDOW = 30 * 24 * 60 * 60
+
+# Details-based filters: filter name -> predicate(result, recent_cutoff) that
+# returns True when a Place Details result passes the filter
+_PREDICATES = {
+    'without_website': lambda r, cutoff: 'website' not in r,
+    'operational': lambda r, cutoff: r.get('business_status') == 'OPERATIONAL',
+    'has_phone': lambda r, cutoff: 'formatted_phone_number' in r,
+    'has_recent_reviews': lambda r, cutoff: any(review['time'] > cutoff for review in r.get('reviews', ())),
+    'has_any_reviews': lambda r, cutoff: bool(r.get('reviews')),
+}
+
+# Output CSV: file name and write buffer (1 MiB)
+CSV_FILENAME = 'businesses.csv'
+CSV_BUFFER_SIZE = 1 << 20
+
+@dataclass(slots=True)
+class Business:
+    """A business that passed the filters; fields are the output CSV columns, in order."""
+
+    name: str
+    phone: str
+    website: str
+    address: str
+    industry: str
+    business_status: str
+
 class BusinessLogic:
     """Handles the core business logic for finding and processing business data."""
 
@@ -25,23 +80,116 @@ class BusinessLogic:
             api_key (str): The API key for accessing Google Maps API.
         """
         self.api_key = api_key
-        self.geolocator = Nominatim(user_agent="business_niche_finder")
+        self._session = None
+        self._geocode_cache = OrderedDict()
+        self._semaphore = asyncio.Semaphore(PLACES_MAX_CONCURRENCY)
+        self._limiter = AsyncLimiter(PLACES_RATE_LIMIT, 1)
+        self._geocode_limiter = AsyncLimiter(1, 1)
+        self._disk_cache = Cache(PLACES_CACHE_DIR)
+
+    def _get_session(self):
+        """
+        Return the shared aiohttp session, creating it on first use.
+
+        The session keeps a pool of keep-alive connections so that TLS
+        handshakes are paid once rather than on every request.
 
-    def get_coordinates(self, place_name):
+        Returns:
+            aiohttp.ClientSession: The shared aiohttp session.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, limit_per_host=10, ttl_dns_cache=300)
+            )
+        return self._session
+
+    async def close(self):
+        """Close the shared aiohttp session, if one was opened, and the disk cache."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self._disk_cache.close()
+
+    async def get_coordinates(self, place_name):
         """
         Get coordinates for a given place name.
 
+        Successful lookups are cached for GEOCODE_CACHE_TTL seconds, keyed by
+        the normalized place name, so repeated searches skip Nominatim. The
+        cache keeps at most GEOCODE_CACHE_SIZE entries, evicting the least
+        recently used.
+
         Args:
             place_name (str): Name of the place to geocode.
 
         Returns:
             str: Latitude and longitude as a string, or None if geocoding fails.
         """
-        try:
-            location = self.geolocator.geocode(place_name)
+        key = place_name.strip().lower()
+        cached_entry = self._geocode_cache.get(key)
+        if cached_entry:
+            if cached_entry[0] > time.time():
+                self._geocode_cache.move_to_end(key)
+                return cached_entry[1]
+            del self._geocode_cache[key]
+
+        coordinates = await self._geocode(place_name)
+        if coordinates:
+            self._geocode_cache[key] = (time.time() + GEOCODE_CACHE_TTL, coordinates)
+            self._geocode_cache.move_to_end(key)
+            if len(self._geocode_cache) > GEOCODE_CACHE_SIZE:
+                self._geocode_cache.popitem(last=False)
+        return coordinates
+
+    async def geocode_many(self, place_names):
+        """
+        Geocode several place names concurrently.
+
+        All lookups are started at once and paced by the Nominatim rate
+        limiter, so N uncached names take about N seconds rather than N
+        round trips plus N seconds. Names that normalize to the same key
+        are looked up only once.
+
+        Args:
+            place_names (list): Names of the places to geocode.
+
+        Returns:
+            dict: Maps each place name that was geocoded to its coordinates string.
+        """
+        unique_names = {}
+        for place_name in place_names:
+            unique_names.setdefault(place_name.strip().lower(), place_name)
+
+        results = await asyncio.gather(*(self.get_coordinates(name) for name in unique_names.values()))
+        coordinates_by_key = dict(zip(unique_names, results))
+
+        coordinates = {}
+        for place_name in place_names:
+            location = coordinates_by_key[place_name.strip().lower()]
             if location:
-                return f"{location.latitude},{location.longitude}"
-        except (GeocoderTimedOut, GeocoderServiceError) as e:
+                coordinates[place_name] = location
+        return coordinates
+
+    async def _geocode(self, place_name):
+        """
+        Geocode a place name with Nominatim, bypassing the cache.
+
+        Args:
+            place_name (str): Name of the place to geocode.
+
+        Returns:
+            str: Latitude and longitude as a string, or None if geocoding fails.
+        """
+        params = {'q': place_name, 'format': 'json', 'limit': 1}
+        headers = {'User-Agent': NOMINATIM_USER_AGENT}
+        try:
+            async with self._geocode_limiter:
+                async with self._get_session().get(NOMINATIM_URL, params=params, headers=headers) as response:
+                    response.raise_for_status()
+                    locations = await response.json()
+            if locations:
+                return f"{locations[0]['lat']},{locations[0]['lon']}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"Geocoding error: {e}")
         return None
 
@@ -58,134 +206,168 @@ class BusinessLogic:
         Returns:
             str: The constructed URL.
         """
-        base_url = f'https://maps.googleapis.com/maps/api/place/nearbysearch/json?location={location}&radius={radius}&key={self.api_key}'
+        params = {'location': location, 'radius': radius, 'key': self.api_key}
         if business_type:
-            base_url += f'&type={business_type}'
+            params['type'] = business_type
         if next_page_token:
-            base_url += f'&pagetoken={next_page_token}'
-        return base_url
+            params['pagetoken'] = next_page_token
+        return f'{NEARBY_BASE}?{urlencode(params)}'
 
-    @cached(ttl=3600)
-    async def fetch(self, session, url):
+    async def fetch(self, url):
         """
-        Fetch data from the given URL using aiohttp.
+        Fetch data from the given URL using the shared aiohttp session.
+
+        Requests are throttled to stay within the Places API quota, which
+        avoids the slow path of throttled responses and retries.
 
         Args:
-            session (aiohttp.ClientSession): The aiohttp session.
             url (str): The URL to fetch data from.
 
         Returns:
             dict: The JSON response.
         """
-        async with session.get(url) as response:
-            return await response.json()
+        async with self._semaphore, self._limiter:
+            async with self._get_session().get(url) as response:
+                return orjson.loads(await response.read())
+
+    # Only Place Details are cached: nearby-search responses carry a
+    # next_page_token that expires within minutes.
+    async def _fetch_details(self, place_id):
+        """
+        Fetch the Place Details result for a place ID.
+
+        Results are kept in the on-disk cache for PLACES_CACHE_TTL seconds,
+        so overlapping searches do not request the same place again.
+
+        Args:
+            place_id (str): The Google Places ID of the business.
 
-    async def get_business_details(self, session, place_id, filters):
+        Returns:
+            dict: The 'result' section of the Place Details response.
+        """
+        cached = self._disk_cache.get(place_id)
+        if cached is not None:
+            return orjson.loads(cached)
+
+        params = {'place_id': place_id, 'fields': DETAIL_FIELDS, 'key': self.api_key}
+        details_url = f'{DETAILS_BASE}?{urlencode(params)}'
+        response = await self.fetch(details_url)
+        result = response.get('result', {})
+        if response.get('status') == 'OK':
+            self._disk_cache.set(place_id, orjson.dumps(result), expire=PLACES_CACHE_TTL)
+        return result
+
+    async def get_business_details(self, place_id, predicates, recent_cutoff):
         """
         Get detailed information about a business and apply filters.
 
         Args:
-            session (aiohttp.ClientSession): The aiohttp session.
             place_id (str): The Google Places ID of the business.
-            filters (dict): Dictionary of filter settings.
+            predicates (list): Predicates of the active filters, from _PREDICATES.
+            recent_cutoff (float): Timestamp after which a review counts as recent.
 
         Returns:
-            dict: Business details if it passes all filters, None otherwise.
+            Business: Business details if it passes all filters, None otherwise.
         """
-        details_url = f'https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=name,formatted_phone_number,website,formatted_address,types,business_status,reviews&key={self.api_key}'
         try:
-            result = await self.fetch(session, details_url)
-            result = result.get('result', {})
+            result = await self._fetch_details(place_id)
         except Exception as e:
             print(f"Error fetching business details: {e}")
             return None
+        if not result:
+            return None
 
         # Apply filters
-        if filters['without_website'] and 'website' in result:
-            return None
-        if filters['operational'] and result.get('business_status') != 'OPERATIONAL':
-            return None
-        if filters['has_phone'] and 'formatted_phone_number' not in result:
+        if any(not predicate(result, recent_cutoff) for predicate in predicates):
             return None
-        if filters['has_recent_reviews'] and not (result.get('reviews') and any(review['time'] > time.time() - 30*24*60*60 for review in result['reviews'])):
-            return None
-        if filters['has_any_reviews'] and not result.get('reviews'):
-            return None
-        
-        return {
-            'name': result['name'],
-            'phone': result.get('formatted_phone_number', 'N/A'),
-            'website': result.get('website', 'N/A'),
-            'address': result.get('formatted_address', 'N/A'),
-            'industry': ', '.join(result.get('types', [])),
-            'business_status': result.get('business_status', 'N/A')
-        }
 
-    async def find_businesses(self, location, radius, business_type, filters, status_callback):
+        return Business(
+            name=result.get('name', 'N/A'),
+            phone=result.get('formatted_phone_number', 'N/A'),
+            website=result.get('website', 'N/A'),
+            address=result.get('formatted_address', 'N/A'),
+            industry=', '.join(result.get('types', [])),
+            business_status=result.get('business_status', 'N/A')
+        )
+
+    @staticmethod
+    def _prefilter(result, filters):
+        """
+        Apply the filters that can be decided from a nearby-search result.
+
+        Rejecting places here saves a Place Details request for each of them.
+        Results that lack a field are kept and left to get_business_details.
+
+        Args:
+            result (dict): A single result from the nearby-search response.
+            filters (dict): Dictionary of filter settings.
+
+        Returns:
+            bool: False if the place can already be ruled out, True otherwise.
+        """
+        if 'place_id' not in result:
+            return False
+        if filters['operational'] and result.get('business_status', 'OPERATIONAL') != 'OPERATIONAL':
+            return False
+        return True
+
+    async def find_businesses(self, location, radius, business_type, filters, status_callback, writer):
         """
         Find businesses based on given criteria and filters.
 
+        Matching businesses are written to the CSV page by page as they
+        arrive rather than collected in memory first.
+
         Args:
             location (str): Latitude and longitude.
             radius (int): Search radius in meters.
             business_type (str): Type of business to search for.
             filters (dict): Dictionary of filter settings.
             status_callback (function): Callback to update status in GUI.
+            writer (csv.writer): Writer for the output CSV, header already written.
 
         Returns:
-            list: List of businesses that match the criteria and pass the filters.
+            int: Number of businesses that match the criteria and pass the filters.
         """
-        businesses = []
+        count = 0
         next_page_token = None
         page = 1
-
-        async with aiohttp.ClientSession() as session:
-            while True:
-                status_callback(f"Searching page {page}...")
-                url = self.build_url(location, radius, business_type, next_page_token)
-                try:
-                    json_response = await self.fetch(session, url)
-                except Exception as e:
-                    print(f"Error fetching businesses: {e}")
-                    break
-
-                if 'results' not in json_response:
-                    break
-
-                tasks = [self.get_business_details(session, result['place_id'], filters) for result in json_response['results']]
+        # Evaluated once per search rather than once per business or review
+        predicates = [predicate for name, predicate in _PREDICATES.items() if filters.get(name)]
+        recent_cutoff = time.time() - RECENT_REVIEW_WINDOW
+
+        while True:
+            status_callback(f"Searching page {page}...")
+            url = self.build_url(location, radius, business_type, next_page_token)
+            try:
+                json_response = await self.fetch(url)
+            except Exception as e:
+                print(f"Error fetching businesses: {e}")
+                break
+
+            if 'results' not in json_response:
+                break
+
+            candidates = [result for result in json_response['results'] if self._prefilter(result, filters)]
+            tasks = [self.get_business_details(result['place_id'], predicates, recent_cutoff) for result in candidates]
+
+            # The next_page_token only becomes valid after a short delay, so
+            # fetch this page's details while waiting for it.
+            next_page_token = json_response.get('next_page_token')
+            if next_page_token:
+                _, *results = await asyncio.gather(asyncio.sleep(2), *tasks)
+            else:
                 results = await asyncio.gather(*tasks)
 
-                for business in results:
-                    if business:
-                        businesses.append(business)
+            businesses = list(filter(None, results))
+            writer.writerows(map(astuple, businesses))
+            count += len(businesses)
 
-                next_page_token = json_response.get('next_page_token')
-                if not next_page_token:
-                    break
-                await asyncio.sleep(2)
-                page += 1
+            if not next_page_token:
+                break
+            page += 1
 
-        return businesses
-
-    @staticmethod
-    def write_to_csv(businesses, filename='businesses.csv'):
-        """
-        Write business data to a CSV file.
-
-        Args:
-            businesses (list): List of dictionaries containing business data.
-            filename (str, optional): Name of the output CSV file. Defaults to 'businesses.csv'.
-        """
-        fieldnames = ['name', 'phone', 'website', 'address', 'industry', 'business_status']
-        try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for business in businesses:
-                    writer.writerow(business)
-            print(f"Data written to {filename}")
-        except IOError as e:
-            print(f"Error writing to CSV: {e}")
+        return count
 
 class BusinessNicheFinderGUI:
     """Handles the GUI for the Business Niche Finder application."""
@@ -201,6 +383,14 @@ class BusinessNicheFinderGUI:
         master.title("Business Niche Finder")
 
         self.business_logic = BusinessLogic(os.getenv('API_KEY'))
+        # One event loop for the life of the GUI, running on a background
+        # thread so network IO never blocks Tk and the shared aiohttp
+        # session (and its connection pool) survives between searches.
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        self._future = None
+        self._status_queue = queue.Queue()
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         self.create_widgets()
 
@@ -244,8 +434,11 @@ class BusinessNicheFinderGUI:
         self.radius_entry.grid(row=6, column=1)
         self.radius_entry.insert(0, "6")
 
-        # Search button
-        ttk.Button(self.master, text="Search", command=self.search).grid(row=7, column=0, columnspan=2)
+        # Search and cancel buttons
+        self.search_button = ttk.Button(self.master, text="Search", command=self.search)
+        self.search_button.grid(row=7, column=0)
+        self.cancel_button = ttk.Button(self.master, text="Cancel", command=self.cancel, state=tk.DISABLED)
+        self.cancel_button.grid(row=7, column=1)
 
         # Status label
         self.status_var = tk.StringVar()
@@ -254,9 +447,7 @@ class BusinessNicheFinderGUI:
 
     def search(self):
         """Perform the business search based on user inputs."""
-        location = self.business_logic.get_coordinates(self.location_entry.get())
-        if not location:
-            messagebox.showerror("Error", "Failed to geocode the location.")
+        if self._future is not None and not self._future.done():
             return
 
         try:
@@ -274,26 +465,101 @@ class BusinessNicheFinderGUI:
         }
 
         self.status_var.set("Searching...")
-        self.master.update_idletasks()
+        self.search_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
 
-        asyncio.run(self.async_search(location, radius, filters))
-
-    async def async_search(self, location, radius, filters):
-        """Asynchronous search for businesses."""
-        businesses = await self.business_logic.find_businesses(
-            location, radius, self.type_var.get(), filters, self.update_status
+        self._future = asyncio.run_coroutine_threadsafe(
+            self.async_search(self.location_entry.get(), radius, self.type_var.get(), filters), self._loop
         )
+        self.master.after(100, self.poll_search)
+
+    async def async_search(self, place_name, radius, business_type, filters):
+        """
+        Asynchronous search for businesses.
+
+        Runs on the background event loop, so it must not touch Tk widgets.
+
+        Returns:
+            str: The final status message to display.
 
-        if businesses:
-            self.business_logic.write_to_csv(businesses)
-            self.status_var.set(f"Found {len(businesses)} businesses. Data written to businesses.csv")
-        else:
-            self.status_var.set("No businesses found based on your criteria.")
+        Raises:
+            ValueError: If the location cannot be geocoded.
+            OSError: If the output CSV cannot be written.
+        """
+        location = await self.business_logic.get_coordinates(place_name)
+        if not location:
+            raise ValueError("Failed to geocode the location.")
+
+        # Stream into a temporary file and only replace the previous output
+        # once the search has finished with results, so a failed, cancelled
+        # or empty search leaves the last good CSV untouched.
+        partial_filename = CSV_FILENAME + '.part'
+        try:
+            with open(partial_filename, 'w', newline='', encoding='utf-8', buffering=CSV_BUFFER_SIZE) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow([field.name for field in fields(Business)])
+                count = await self.business_logic.find_businesses(
+                    location, radius, business_type, filters, self.update_status, writer
+                )
+            if count:
+                os.replace(partial_filename, CSV_FILENAME)
+        finally:
+            if os.path.exists(partial_filename):
+                os.remove(partial_filename)
+
+        if count:
+            return f"Found {count} businesses. Data written to {CSV_FILENAME}"
+        return "No businesses found based on your criteria."
+
+    def poll_search(self):
+        """Apply pending status updates and the final result of a running search."""
+        while not self._status_queue.empty():
+            self.status_var.set(self._status_queue.get_nowait())
+
+        if not self._future.done():
+            self.master.after(100, self.poll_search)
+            return
+
+        self.search_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        if self._future.cancelled():
+            self.status_var.set("Search cancelled.")
+            return
+
+        try:
+            self.status_var.set(self._future.result())
+        except ValueError as e:
+            self.status_var.set("")
+            messagebox.showerror("Error", str(e))
+        except Exception as e:
+            self.status_var.set("")
+            messagebox.showerror("Error", f"Search failed: {e}")
+
+    def cancel(self):
+        """Cancel the running search, if any."""
+        if self._future is not None:
+            self._future.cancel()
+
+    def on_close(self):
+        """Close network resources, stop the event loop and destroy the window."""
+        if self._future is not None:
+            self._future.cancel()
+        try:
+            asyncio.run_coroutine_threadsafe(self.business_logic.close(), self._loop).result(timeout=5)
+        except Exception as e:
+            print(f"Error closing network resources: {e}")
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self.master.destroy()
 
     def update_status(self, message):
-        """Update the status message in the GUI."""
-        self.status_var.set(message)
-        self.master.update_idletasks()
+        """
+        Queue a status message for the GUI.
+
+        Called from the background event loop; the message is applied on
+        the Tk thread by poll_search.
+        """
+        self._status_queue.put(message)
 
 if __name__ == '__main__':
     root = tk.Tk()